@@ -6,37 +6,58 @@ os.environ["STREAMLIT_WATCHDOG"] = "false"
 import time
 from PIL import Image
 import json
+import queue
 from datetime import datetime
-import csv
-import psutil
+from collections import deque
+import numpy as np
 
 # Import modular components
-from raspberry_motion_detector import simulate_pir_trigger_button, is_object_detection_active, init_motion_state, DETECTION_ACTIVE_DURATION_S
-from raspberry_object_detector import load_yolo_model, detect_objects, draw_detections
-from telegram_notifier import send_telegram_animation, init_telegram_state, can_send_notification
-from utils import save_sequence_as_jpgs, create_gif_from_frames, NUM_JPG_FRAMES_TO_SAVE, NUM_GIF_FRAMES
+from raspberry_motion_detector import simulate_pir_trigger_button, is_object_detection_active, init_motion_state, wait_for_motion, reset_motion_latch, DETECTION_ACTIVE_DURATION_S
+from raspberry_object_detector import load_yolo_model, resolve_model_path, scale_detections, draw_detections, new_label_strip, FrameDiffGate, AsyncDetector, EMPTY_DETECTIONS, PET_CLASS_IDS
+from telegram_notifier import send_telegram_animation_async, init_telegram_state, can_send_notification
+from utils import save_sequence_as_jpgs, create_mp4_from_frames_async, PerformanceLogger, NUM_JPG_FRAMES_TO_SAVE, NUM_GIF_FRAMES
 
 #PICAMERA_AVAILABLE = False
 # Try to import picamera2 for Raspberry Pi camera support
 try:
-    from picamera2 import Picamera2
-    import numpy as np
+    from picamera2 import Picamera2, MappedArray
     PICAMERA_AVAILABLE = True
 except ImportError:
     PICAMERA_AVAILABLE = False
     print("Warning: picamera2 not available. Falling back to OpenCV camera.")
 
+# OpenCV's Transparent API can run cvtColor/resize on the GPU via OpenCL
+# (e.g. VideoCore on the Pi 5) when a driver is present; otherwise stay on CPU
+OPENCL_AVAILABLE = cv2.ocl.haveOpenCL()
+cv2.ocl.setUseOpenCL(OPENCL_AVAILABLE)
+if not OPENCL_AVAILABLE:
+    print("Info: OpenCL not available. OpenCV pixel operations will run on the CPU.")
+
+# orjson is an optional faster JSON encoder/decoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # --- Page Configuration ---
 st.set_page_config(page_title="Intrusion Detection System", layout="wide")
 
 # --- Constants ---
-YOLO_MODEL_PATH = "yolo11n.pt"
+# Quantized exports first (see export_quantized_model), original weights last
+YOLO_MODEL_CANDIDATES = [
+    "yolo11n_int8_ncnn_model", "yolo11n_int8.engine", "yolo11n_int8_openvino_model",
+    "yolo11n_fp16.engine", "yolo11n_fp16_openvino_model", "yolo11n.onnx", "yolo11n.pt",
+]
+YOLO_MODEL_PATH = resolve_model_path(YOLO_MODEL_CANDIDATES)
 CONFIG_FILE = "config.json"
 DETECTIONS_FILE = "previous_detections.json"
 MAX_PREVIOUS_DETECTIONS = 5
+MEDIA_EXISTS_TTL_S = 5  # how long a cached os.path.exists result stays valid
 SNAPSHOT_DIR = "snapshots"
 DETECTION_RESET_TIME = 1  # seconds
-SLEEP_INTERVAL_S = 0.05  # Change this value for each test: e.g., 0.5, 0.25, etc.
+SLEEP_INTERVAL_S = 0.0  # Frame pacing; 0 runs at the camera's frame rate. For tests: e.g., 0.5, 0.25, etc.
+STATUS_UPDATE_INTERVAL_S = 0.25  # Throttle for the status panel redraw
+DISPLAY_UPDATE_INTERVAL_S = 0.1  # Throttle for pushing frames to the browser
 
 
 
@@ -61,37 +82,81 @@ def save_config(data):
         json.dump(data, f, indent=4)
 
 def load_previous_detections():
-    """Load previous detections from file."""
+    """Load previous detections (newest first) from file into a bounded deque."""
+    detections = []
     if os.path.exists(DETECTIONS_FILE):
         try:
-            with open(DETECTIONS_FILE, 'r') as f:
-                return json.load(f)
+            if orjson is not None:
+                with open(DETECTIONS_FILE, 'rb') as f:
+                    detections = orjson.loads(f.read())
+            else:
+                with open(DETECTIONS_FILE, 'r') as f:
+                    detections = json.load(f)
         except:
-            return []
-    return []
+            detections = []
+    return deque(detections[:MAX_PREVIOUS_DETECTIONS], maxlen=MAX_PREVIOUS_DETECTIONS)
 
 def save_previous_detections(detections):
     """Save previous detections to file."""
     try:
-        with open(DETECTIONS_FILE, 'w') as f:
-            json.dump(detections, f, indent=4)
+        if orjson is not None:
+            with open(DETECTIONS_FILE, 'wb') as f:
+                f.write(orjson.dumps(list(detections), option=orjson.OPT_INDENT_2))
+        else:
+            with open(DETECTIONS_FILE, 'w') as f:
+                json.dump(list(detections), f, indent=4)
     except Exception as e:
         print(f"Error saving detections: {e}")
 
+def record_detection(detection_info):
+    """Prepend a detection event; the deque drops the oldest beyond MAX_PREVIOUS_DETECTIONS."""
+    st.session_state.previous_detections.appendleft(detection_info)
+    save_previous_detections(st.session_state.previous_detections)
+
+def media_exists(path):
+    """os.path.exists with a short per-session TTL cache for the history sidebar."""
+    if not path:
+        return False
+    cache = st.session_state.setdefault('media_exists_cache', {})
+    now = time.time()
+    cached = cache.get(path)
+    if cached is None or now - cached[0] > MEDIA_EXISTS_TTL_S:
+        cached = (now, os.path.exists(path))
+        cache[path] = cached
+    return cached[1]
+
 class RaspberryPiCamera:
     """Wrapper class for Raspberry Pi camera using picamera2"""
+    POOL_SIZE = 3
     def __init__(self):
         if not PICAMERA_AVAILABLE:
             raise ImportError("picamera2 not available")
         
         self.picam = Picamera2()
-        # Configure camera for video capture
+        # Configure camera for video capture. picamera2 names formats by
+        # little-endian word order, so "BGR888" arrays are RGB in numpy.
         config = self.picam.create_video_configuration(
-            main={"size": (640, 480)},
-            lores={"size": (320, 240)},
-            display="lores"
+            main={"size": (640, 480), "format": "BGR888"},
+            lores={"size": (320, 240), "format": "BGR888"},
+            display="lores",
+            buffer_count=4  # frames are copied out in the callback, so few DMA buffers are needed
         )
         self.picam.configure(config)
+        # Preallocated (main, lores) pairs the callback copies into straight from
+        # the mapped DMA buffers; 3 covers the pair the loop holds, the queued
+        # one and the one being filled
+        self._pool = [
+            (np.empty((480, 640, 3), dtype=np.uint8), np.empty((240, 320, 3), dtype=np.uint8))
+            for _ in range(self.POOL_SIZE)
+        ]
+        self._free = queue.Queue()
+        for slot in range(self.POOL_SIZE):
+            self._free.put(slot)
+        self._held = None  # slot returned by the last read()
+        # Event-driven capture: picamera2 hands us each frame as the ISP
+        # completes it, instead of the loop polling capture_arrays()
+        self._frames = queue.Queue(maxsize=1)
+        self.picam.post_callback = self._on_frame
         self.is_opened = False
     
     def start(self):
@@ -104,20 +169,47 @@ class RaspberryPiCamera:
             print(f"Error starting Raspberry Pi camera: {e}")
             return False
     
-    def read(self):
-        """Read a frame from the camera"""
+    def _on_frame(self, request):
+        """picamera2 post_callback: runs on the camera thread for every completed frame."""
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            return  # loop is behind; drop this frame rather than allocate
+        main_buf, lores_buf = self._pool[slot]
+        for stream, buf in (("main", main_buf), ("lores", lores_buf)):
+            with MappedArray(request, stream) as mapped:
+                h, w = buf.shape[:2]
+                np.copyto(buf, mapped.array[:h, :w, :3])
+        # keep only the freshest frame pair so the loop never processes a stale one
+        try:
+            self._free.put(self._frames.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            self._frames.put_nowait(slot)
+        except queue.Full:
+            self._free.put(slot)
+
+    def read(self, timeout=1.0):
+        """
+        Wait for the next main frame and the ISP-downscaled lores frame used for
+        detection. The arrays are pooled and only valid until the next read().
+        """
         if not self.is_opened:
-            return False, None
-        
+            return False, None, None
+
         try:
-            # Capture frame as numpy array
-            frame = self.picam.capture_array()
-            # Convert from RGB to BGR for OpenCV compatibility
-            frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            return True, frame_bgr
-        except Exception as e:
-            print(f"Error reading from Raspberry Pi camera: {e}")
-            return False, None
+            slot = self._frames.get(timeout=timeout)
+            # the caller is done with the previous pair once it asks for a new one
+            if self._held is not None:
+                self._free.put(self._held)
+            self._held = slot
+            # Both streams arrive as RGB numpy arrays; the whole pipeline is RGB
+            frame_rgb, lores_rgb = self._pool[slot]
+            return True, frame_rgb, lores_rgb
+        except queue.Empty:
+            print("Error reading from Raspberry Pi camera: no frame within timeout")
+            return False, None, None
     
     def release(self):
         """Release the camera completely."""
@@ -140,6 +232,43 @@ class RaspberryPiCamera:
         """Check if camera is opened"""
         return self.is_opened
 
+class USBCamera:
+    """Wrapper around cv2.VideoCapture that yields RGB frames like RaspberryPiCamera"""
+    DETECT_SIZE = (320, 240)  # matches the Pi camera's lores stream
+
+    def __init__(self, index=0):
+        self.cap = cv2.VideoCapture(index)
+        # two detection buffers, alternated so the frame YOLO is still
+        # working on is never overwritten by the next read
+        self._detect_bufs = [np.empty((self.DETECT_SIZE[1], self.DETECT_SIZE[0], 3), dtype=np.uint8) for _ in range(2)]
+        self._buf_idx = 0
+
+    def read(self):
+        """Read a frame, convert it from OpenCV's BGR to RGB once and downscale it for detection"""
+        ret, frame_bgr = self.cap.read()
+        if not ret:
+            return False, None, None
+        if OPENCL_AVAILABLE:
+            # convert and downscale on the GPU, download only the results
+            rgb_umat = cv2.cvtColor(cv2.UMat(frame_bgr), cv2.COLOR_BGR2RGB)
+            detect_umat = cv2.resize(rgb_umat, self.DETECT_SIZE, interpolation=cv2.INTER_LINEAR)
+            return True, rgb_umat.get(), detect_umat.get()
+
+        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        # no ISP downscaler here, so resize on the CPU (NEON) into a reused buffer
+        detect_rgb = self._detect_bufs[self._buf_idx]
+        self._buf_idx ^= 1
+        cv2.resize(frame_rgb, self.DETECT_SIZE, dst=detect_rgb, interpolation=cv2.INTER_LINEAR)
+        return True, frame_rgb, detect_rgb
+
+    def release(self):
+        """Release the capture device."""
+        self.cap.release()
+
+    def isOpened(self):
+        """Check if camera is opened"""
+        return self.cap.isOpened()
+
 def initialize_camera():
     """Initialize camera - try Raspberry Pi camera first, then fallback to USB/webcam"""
     camera = None
@@ -161,7 +290,7 @@ def initialize_camera():
     # Fallback to USB/webcam
     if camera is None:
         try:
-            camera = cv2.VideoCapture(0)
+            camera = USBCamera(0)
             if camera.isOpened():
                 camera_type = "USB/Webcam"
                 st.info("📹 Using USB/Webcam camera")
@@ -188,6 +317,14 @@ if 'camera_type' not in st.session_state:
 if 'yolo_model' not in st.session_state:
     st.session_state.yolo_model = load_yolo_model(YOLO_MODEL_PATH)
 
+# Background YOLO worker so inference never blocks frame capture or the UI
+if 'async_detector' not in st.session_state:
+    st.session_state.async_detector = AsyncDetector(st.session_state.yolo_model)
+
+# Profiling log, written off the detection loop
+if 'perf_logger' not in st.session_state:
+    st.session_state.perf_logger = None
+
 # Telegram Config
 if 'telegram_bot_token' not in st.session_state:
     st.session_state.telegram_bot_token = config.get("telegram_bot_token", "")
@@ -201,8 +338,16 @@ if 'previous_detections' not in st.session_state:
     st.session_state.previous_detections = load_previous_detections()
 if 'collecting_frames_for_event' not in st.session_state:
     st.session_state.collecting_frames_for_event = False
-if 'current_event_frames' not in st.session_state:
-    st.session_state.current_event_frames = []
+if 'event_buf' not in st.session_state:
+    # Ring buffer for event frames, reused across events; resized on first
+    # frame if the camera delivers a different resolution
+    st.session_state.event_buf = np.empty((NUM_GIF_FRAMES, 480, 640, 3), dtype=np.uint8)
+    # Second buffer, swapped in while the clip encoder owns the first, and
+    # the future of the clip being encoded from it
+    st.session_state.spare_event_buf = None
+    st.session_state.spare_event_future = None
+if 'event_idx' not in st.session_state:
+    st.session_state.event_idx = 0
 if 'detection_event_processed' not in st.session_state:
     st.session_state.detection_event_processed = False
 
@@ -239,7 +384,8 @@ with st.sidebar:
                 st.session_state.system_running = True
                 st.session_state.detection_event_processed = False
                 st.session_state.collecting_frames_for_event = False
-                st.session_state.current_event_frames = []
+                st.session_state.event_idx = 0
+                reset_motion_latch()
                 st.rerun()
     else:
         if st.button("🛑 Stop System", use_container_width=True):
@@ -276,7 +422,7 @@ with st.sidebar:
     if not is_object_detection_active() and st.session_state.detection_event_processed:
         st.session_state.detection_event_processed = False
         st.session_state.collecting_frames_for_event = False
-        st.session_state.current_event_frames = []
+        st.session_state.event_idx = 0
 
     st.markdown("---")
     with st.expander("📜 Previous Detections", expanded=True):
@@ -286,9 +432,12 @@ with st.sidebar:
             for i, det_event in enumerate(st.session_state.previous_detections):
                 st.markdown(f"**Event {len(st.session_state.previous_detections) - i}: {det_event['timestamp']}**")
                 st.markdown(f"*{det_event['caption']}*")
-                if det_event.get("gif_path") and os.path.exists(det_event["gif_path"]):
+                # "gif_path" holds the event clip: an H.264 MP4, or a GIF when OpenCV has no H.264 encoder
+                if media_exists(det_event.get("gif_path")) and det_event["gif_path"].endswith(".mp4"):
+                    st.video(det_event["gif_path"])
+                elif media_exists(det_event.get("gif_path")):
                     st.image(det_event["gif_path"], caption="Detected Event GIF") 
-                elif det_event.get("representative_jpg_path") and os.path.exists(det_event["representative_jpg_path"]):
+                elif media_exists(det_event.get("representative_jpg_path")):
                     st.image(det_event["representative_jpg_path"], caption="Representative Frame")
                 else:
                     st.caption("Media not found.")
@@ -297,6 +446,7 @@ with st.sidebar:
 
 # --- Main Application Logic ---
 frame_placeholder = col1.empty()
+col2.subheader("📊 Status")
 status_placeholder = col2.empty()
 
 if st.session_state.yolo_model is None:
@@ -317,8 +467,16 @@ if st.session_state.system_running:
             st.rerun()
 
     camera = st.session_state.camera
+    if st.session_state.perf_logger is None:
+        st.session_state.perf_logger = PerformanceLogger("project_test_enhanced.csv")
     
     frame_time_prev = time.time()
+    last_status_update = 0.0
+    last_display_update = 0.0
+    detection_gate = FrameDiffGate()
+    draw_buf = None  # reused target for the annotated preview frame
+    class_names = st.session_state.yolo_model.names
+    label_strip = new_label_strip()  # per session: each runs on its own thread
 
     while st.session_state.system_running and camera and camera.isOpened():
         loop_start_time = time.time()
@@ -334,15 +492,15 @@ if st.session_state.system_running:
         
         pir_triggered = simulate_pir_trigger_button()
 
-        ret, frame_bgr = camera.read()
+        ret, frame_rgb, detect_rgb = camera.read()
         if not ret:
             status_placeholder.error("Cannot read frame from camera. Stopping system.")
             st.session_state.system_running = False
             break
 
         # 2) Update your status based on the fresh PIR reading
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        display_frame = frame_rgb.copy()
+        # only copied when boxes are actually drawn onto it
+        display_frame = frame_rgb
         # … rest of your object-detection code …
 
         status_message_main = "👀 Monitoring..."
@@ -354,194 +512,199 @@ if st.session_state.system_running:
             
             if not st.session_state.detection_event_processed:
                 status_message_main = "🔍 Detecting Objects..."
-                detections, person_found = detect_objects(frame_bgr, st.session_state.yolo_model)
+                # Non-blocking: hand the frame to the background detector when the
+                # scene changed (it keeps only what it can use); always draw the
+                # newest result
+                async_detector = st.session_state.async_detector
+                if detection_gate.should_infer(detect_rgb):
+                    async_detector.submit(detect_rgb)
+                found, person_found = async_detector.latest()
+                detections = scale_detections(found, detect_rgb.shape, frame_rgb.shape)
                 
                 #===Baseline Profiling Logging ===
-                log_path = "project_test_enhanced.csv"
+                # system stats are sampled and written by the logger thread
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 inference_time = loop_start_time - frame_time_prev
                 frame_time_prev = loop_start_time
                 fps = 1 / inference_time if inference_time > 0 else 0
-                cpu_percent = psutil.cpu_percent(interval=None)
-                ram_percent = psutil.virtual_memory().percent
-                
-                
-                try:
-                    temp_output = subprocess.check_output(["vcgencmd", "measure_temp"]).decode()
-                    temperature = float(temp_output.replace("temp=", "").replace("'C\n", ""))
-                except Exception:
-                    temperature = None
-
-                # Extract detections safely
-                try:
-                    detection_classes = []
-                    if detections:
-                        for det in detections:
-                            class_name = det.get("class_name", "unknown")
-                            detection_classes.append(class_name)
-                except Exception as outer:
-                    print(f"[!] Error in detection_classes loop: {outer}")
-                    detection_classes = []
-
-                person_detected = "person" in detection_classes
-                num_detections = len(detection_classes)
-
-                log_row = [
+
+                # Detections are parallel arrays (boxes, class ids, confidences)
+                cls_ids = detections.cls_ids
+                num_detections = cls_ids.size
+                pet_found = bool(np.isin(cls_ids, PET_CLASS_IDS).any())
+
+                st.session_state.perf_logger.log(
                     timestamp, inference_time, fps,
-                    cpu_percent, ram_percent, temperature,
-                    person_detected, num_detections, SLEEP_INTERVAL_S
-                ]
-
-
-                try:
-                    file_exists = os.path.exists(log_path)
-                    with open(log_path, "a", newline="") as f:
-                        writer = csv.writer(f)
-                        if not file_exists:
-                            writer.writerow([
-                                "timestamp", "inference_time", "fps",
-                                "cpu_percent", "ram_percent", "temperature",
-                                "person_detected", "num_detections", "sleep_interval"
-                            ])
-                        writer.writerow(log_row)
-                    print(f"[+] Logged: {log_row}")
-                except Exception as write_error:
-                    print(f"[!] Logging failed: {write_error}")
+                    person_found, num_detections, SLEEP_INTERVAL_S
+                )
                 
                 # Analyze detections
-                detected_classes = {det["class_name"] for det in detections}
                 
                 if person_found:
                     status_message_main = "👤 PERSON DETECTED!"
                     st.session_state.last_detection_time = time.time()
 
-                elif "dog" in detected_classes or "cat" in detected_classes:
+                elif pet_found:
                     status_message_main = "🐾 Pet detected (dog/cat) - No security concern"
                     person_found = False  # Ensure we don't trigger alerts for pets
                 
                 # Always show detections in the frame
-                display_frame = draw_detections(frame_rgb, detections)
+                if draw_buf is None or draw_buf.shape != frame_rgb.shape:
+                    draw_buf = np.empty_like(frame_rgb)
+                display_frame = draw_detections(frame_rgb, detections, class_names, out=draw_buf, label_strip=label_strip)
                 
                 if person_found:
                     if not st.session_state.collecting_frames_for_event:
                         st.session_state.collecting_frames_for_event = True
-                        st.session_state.current_event_frames = []
+                        st.session_state.event_idx = 0
  
              
                 
                 elif st.session_state.collecting_frames_for_event:
                     status_message_main = "👤 Person momentarily lost, continuing frame collection..."
                 else:
-                    if detected_classes:
+                    if num_detections:
+                        detected_classes = {class_names[c] for c in np.unique(cls_ids).tolist()}
                         status_message_main = f"👁️ Detected: {', '.join(detected_classes)}"
                     else:
                         status_message_main = "👁️ Motion detected, no objects of interest found"
             else:
+                st.session_state.async_detector.reset()
+                detection_gate.reset()
                 status_message_main = "✅ Event processed, awaiting next PIR trigger."
 
             if st.session_state.collecting_frames_for_event:
-                st.session_state.current_event_frames.append(frame_bgr.copy())
-                status_message_main += f" (Collecting frame {len(st.session_state.current_event_frames)}/{NUM_GIF_FRAMES})"
-                if len(st.session_state.current_event_frames) >= NUM_GIF_FRAMES:
+                if st.session_state.event_buf.shape[1:] != frame_rgb.shape:
+                    st.session_state.event_buf = np.empty((NUM_GIF_FRAMES, *frame_rgb.shape), dtype=np.uint8)
+                np.copyto(st.session_state.event_buf[st.session_state.event_idx % NUM_GIF_FRAMES], frame_rgb)
+                st.session_state.event_idx += 1
+                status_message_main += f" (Collecting frame {st.session_state.event_idx}/{NUM_GIF_FRAMES})"
+                if st.session_state.event_idx >= NUM_GIF_FRAMES:
                     st.session_state.collecting_frames_for_event = False
                     st.session_state.detection_event_processed = True
                     
-                    first_event_frame_detections = detections if 'detections' in locals() and detections else []
+                    first_event_frame_detections = detections if 'detections' in locals() else EMPTY_DETECTIONS
 
+                    # draw in place on the event buffer (handed to the encoder
+                    # below) and reuse the first frames for the JPG snapshots
+                    frames_with_detections = st.session_state.event_buf
+                    for f in frames_with_detections:
+                        draw_detections(f, first_event_frame_detections, class_names, out=f, label_strip=label_strip)
                     jpg_paths = save_sequence_as_jpgs(
-                        [draw_detections(f.copy(), first_event_frame_detections) for f in st.session_state.current_event_frames[:NUM_JPG_FRAMES_TO_SAVE]],
+                        frames_with_detections[:NUM_JPG_FRAMES_TO_SAVE],
                         base_filename=""
                     )
-                    frames_for_gif_with_detections = [
-                        draw_detections(f.copy(), first_event_frame_detections) for f in st.session_state.current_event_frames
-                    ]
-                    gif_path = create_gif_from_frames(
-                        frames_for_gif_with_detections,
-                        base_filename="gif"
+                    # the encoder thread now owns these frames; collect the next
+                    # event into the spare buffer once its own clip is written.
+                    # The clip path is known up front, so the event is recorded
+                    # without waiting for the encode.
+                    clip_path, clip_future = create_mp4_from_frames_async(
+                        frames_with_detections,
+                        base_filename="clip"
                     )
-                    st.session_state.current_event_frames = []
+                    spare = st.session_state.spare_event_buf
+                    spare_future = st.session_state.spare_event_future
+                    if (spare is None or spare.shape != frames_with_detections.shape
+                            or (spare_future is not None and not spare_future.done())):
+                        # first event, or the previous clip is somehow still encoding
+                        spare = np.empty_like(frames_with_detections)
+                    st.session_state.spare_event_buf = frames_with_detections
+                    st.session_state.spare_event_future = clip_future
+                    st.session_state.event_buf = spare
+                    st.session_state.event_idx = 0
                     
                     # Check if notifications are enabled before attempting to send
-                    if st.session_state.telegram_notifications_enabled and gif_path and can_send_notification():
+                    if st.session_state.telegram_notifications_enabled and can_send_notification():
                         caption = "🚨 Intrusion Alert: Person Detected!"
-                        if send_telegram_animation(
+                        # queued on a background thread behind the encode; recorded right away
+                        if send_telegram_animation_async(
                             st.session_state.telegram_bot_token,
                             st.session_state.telegram_chat_id,
                             caption,
-                            gif_path
+                            clip_path,
+                            ready=clip_future
                         ):
                             detection_info = {
                                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "gif_path": gif_path,
+                                "gif_path": clip_path,
                                 "representative_jpg_path": jpg_paths[0] if jpg_paths else None,
                                 "all_jpg_paths": jpg_paths,
                                 "caption": caption
                             }
-                            st.session_state.previous_detections.insert(0, detection_info)
-                            if len(st.session_state.previous_detections) > MAX_PREVIOUS_DETECTIONS:
-                                st.session_state.previous_detections.pop()
-                            save_previous_detections(st.session_state.previous_detections)
-                            status_message_main = "👤 PERSON DETECTED! GIF sent."
-                    elif not st.session_state.telegram_notifications_enabled and gif_path:
+                            record_detection(detection_info)
+                            status_message_main = "👤 PERSON DETECTED! Sending clip..."
+                    elif not st.session_state.telegram_notifications_enabled:
                         detection_info = {
                             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "gif_path": gif_path,
+                            "gif_path": clip_path,
                             "representative_jpg_path": jpg_paths[0] if jpg_paths else None,
                             "all_jpg_paths": jpg_paths,
                             "caption": "Intrusion Alert: Person Detected (Notification Disabled)"
                         }
-                        st.session_state.previous_detections.insert(0, detection_info)
-                        if len(st.session_state.previous_detections) > MAX_PREVIOUS_DETECTIONS:
-                            st.session_state.previous_detections.pop()
-                        save_previous_detections(st.session_state.previous_detections)
-                        status_message_main = "👤 PERSON DETECTED! GIF created (Notifications disabled)."
-                    elif gif_path:  # Notifications enabled, but cooldown active
+                        record_detection(detection_info)
+                        status_message_main = "👤 PERSON DETECTED! Saving clip (Notifications disabled)."
+                    else:  # Notifications enabled, but cooldown active
                         detection_info = {
                             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "gif_path": gif_path,
+                            "gif_path": clip_path,
                             "representative_jpg_path": jpg_paths[0] if jpg_paths else None,
                             "all_jpg_paths": jpg_paths,
                             "caption": "Intrusion Alert: Person Detected (Cooldown)"
                         }
-                        st.session_state.previous_detections.insert(0, detection_info)
-                        if len(st.session_state.previous_detections) > MAX_PREVIOUS_DETECTIONS:
-                            st.session_state.previous_detections.pop()
-                        save_previous_detections(st.session_state.previous_detections)
-                        status_message_main = "👤 PERSON DETECTED! GIF created (Notification cooldown)."
-                    else:  # GIF creation failed
-                        status_message_main = "👤 PERSON DETECTED! Error creating GIF."
+                        record_detection(detection_info)
+                        status_message_main = "👤 PERSON DETECTED! Saving clip (Notification cooldown)."
         else:
+            st.session_state.async_detector.reset()
+            detection_gate.reset()
             if st.session_state.collecting_frames_for_event:
                 st.session_state.collecting_frames_for_event = False
-                st.session_state.current_event_frames = []
+                st.session_state.event_idx = 0
             if st.session_state.detection_event_processed:
                 st.session_state.detection_event_processed = False
 
-        frame_placeholder.image(display_frame, channels="RGB") 
-        
-        with status_placeholder:
-            st.subheader("📊 Status")
-            st.info(f"**System Status:** {'Running' if st.session_state.system_running else 'Stopped'}")
-            st.write(f"**Camera:** {st.session_state.camera_type}")
-            st.write(f"**Motion Sensor:** {'TRIGGERED' if pir_is_currently_active else 'Idle'}")
-            st.write(f"**Object Detection:** {detection_active_status_main}")
-            if st.session_state.collecting_frames_for_event:
-                st.write(f"**Frames Collected:** {len(st.session_state.current_event_frames)}/{NUM_GIF_FRAMES}")
-            st.info(f"**Last Event:** {status_message_main}")
-            if pir_is_currently_active:
-                time_left = DETECTION_ACTIVE_DURATION_S - (time.time() - st.session_state.pir_triggered_time)
-                st.progress(max(0, time_left) / DETECTION_ACTIVE_DURATION_S)
-                st.caption(f"Detection active for: {max(0, int(time_left))}s more")
-
-        # Small delay to prevent overwhelming the system
-        time.sleep(0.05)
+        # Frames are still captured at full rate (the event clip needs them); only
+        # the websocket pushes to the browser are throttled
+        now = time.time()
+        if now - last_display_update >= DISPLAY_UPDATE_INTERVAL_S:
+            frame_placeholder.image(display_frame, channels="RGB")
+            last_display_update = now
+
+        if now - last_status_update >= STATUS_UPDATE_INTERVAL_S:
+            last_status_update = now
+            with status_placeholder:
+                st.info(f"**System Status:** {'Running' if st.session_state.system_running else 'Stopped'}")
+                st.write(f"**Camera:** {st.session_state.camera_type}")
+                st.write(f"**Motion Sensor:** {'TRIGGERED' if pir_is_currently_active else 'Idle'}")
+                st.write(f"**Object Detection:** {detection_active_status_main}")
+                if st.session_state.collecting_frames_for_event:
+                    st.write(f"**Frames Collected:** {st.session_state.event_idx}/{NUM_GIF_FRAMES}")
+                st.info(f"**Last Event:** {status_message_main}")
+                if pir_is_currently_active:
+                    time_left = DETECTION_ACTIVE_DURATION_S - (time.time() - st.session_state.pir_triggered_time)
+                    st.progress(max(0, time_left) / DETECTION_ACTIVE_DURATION_S)
+                    st.caption(f"Detection active for: {max(0, int(time_left))}s more")
+
+        # Optional pacing to SLEEP_INTERVAL_S per frame; by default the loop is
+        # driven by camera.read() blocking until the next frame arrives
+        remaining = SLEEP_INTERVAL_S - (time.time() - loop_start_time)
+        if not pir_is_currently_active:
+            # Idle: nothing to detect, so only wake for the next preview update,
+            # or right away when the PIR fires
+            remaining = max(remaining, last_display_update + DISPLAY_UPDATE_INTERVAL_S - time.time())
+            if remaining > 0:
+                wait_for_motion(remaining)
+        elif remaining > 0:
+            time.sleep(remaining)
 
     if not st.session_state.system_running:
         if st.session_state.camera:
             st.session_state.camera.release()
             st.session_state.camera = None
+        if st.session_state.perf_logger:
+            st.session_state.perf_logger.close()
+            st.session_state.perf_logger = None
         st.session_state.collecting_frames_for_event = False
-        st.session_state.current_event_frames = []
+        st.session_state.event_idx = 0
         st.session_state.detection_event_processed = False
         st.rerun()
 
@@ -549,8 +712,11 @@ elif not st.session_state.system_running:
     if st.session_state.camera:
         st.session_state.camera.release()
         st.session_state.camera = None
+    if st.session_state.perf_logger:
+        st.session_state.perf_logger.close()
+        st.session_state.perf_logger = None
     st.session_state.collecting_frames_for_event = False
-    st.session_state.current_event_frames = []
+    st.session_state.event_idx = 0
     st.session_state.detection_event_processed = False
 
     # Create a placeholder image if it doesn't exist
@@ -573,7 +739,6 @@ elif not st.session_state.system_running:
         frame_placeholder.error(f"Error loading placeholder image: {e}")
     
     with status_placeholder:
-        st.subheader("📊 Status")
         st.info("**System Status:** Stopped")
         st.write("**Camera:** Ready")
         st.write("Configure settings and click 'Start System'.")
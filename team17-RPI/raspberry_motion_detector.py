@@ -1,5 +1,6 @@
 # motion_detector.py
 import streamlit as st
+import threading
 import time
 from gpiozero import MotionSensor
 
@@ -7,7 +8,20 @@ from gpiozero import MotionSensor
 DETECTION_ACTIVE_DURATION_S = 10  # seconds
 
 # --- use MotionSensor on BCM 21 ---
-pir = MotionSensor(21)
+pir = MotionSensor(21, queue_len=1)
+
+# Set from gpiozero's background thread on the motion edge and latched until
+# the loop consumes it, so a short pulse between two polls is not missed
+_motion_event = threading.Event()
+pir.when_motion = _motion_event.set
+
+def reset_motion_latch():
+    """Forget motion latched while the system was stopped (call on start)."""
+    _motion_event.clear()
+
+def wait_for_motion(timeout=None):
+    """Sleep until the PIR fires or `timeout` seconds pass. Returns True on motion."""
+    return _motion_event.wait(timeout)
 
 def init_motion_state():
     if 'pir_triggered_time' not in st.session_state:
@@ -23,7 +37,8 @@ def simulate_pir_trigger_button():
     init_motion_state()
 
     # gpiozero gives .is_active = True while motion is detected
-    if pir.is_active:
+    if _motion_event.is_set() or pir.is_active:
+        _motion_event.clear()
         st.session_state.pir_triggered_time = time.time()
         st.session_state.object_detection_active = True
         st.toast("Motion Detected! Activating Object Detection...")
@@ -1,4 +1,22 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Inference gets every core but core 0, which is left to Streamlit and the
+# camera threads. OMP_NUM_THREADS must be set before torch loads; no
+# OMP_PROC_BIND/OMP_PLACES, since libgomp would then bind its threads to
+# places built from the whole process mask instead of inheriting the
+# inference worker's mask (see _pin_inference_thread).
+_ALL_CORES = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+INFERENCE_CORES = set(_ALL_CORES[1:] if len(_ALL_CORES) > 2 else _ALL_CORES)
+os.environ.setdefault("OMP_NUM_THREADS", str(len(INFERENCE_CORES)))
+
 import cv2
+import numpy as np
 import torch
 import torch.nn.modules.container as container
 
@@ -6,8 +24,15 @@ from ultralytics import YOLO
 from ultralytics.nn.tasks import DetectionModel
 
 import streamlit as st
+import yaml
 from picamera2 import Picamera2
 
+try:
+    # lets NCNN exports skip ultralytics' pre/post-processing (see NCNNDetector)
+    import ncnn
+except ImportError:
+    ncnn = None
+
 # allowlist for safe weights-only loading
 torch.serialization.add_safe_globals([
     DetectionModel,
@@ -17,81 +42,459 @@ torch.serialization.add_safe_globals([
 # how long (s) to keep object detection “active” after a PIR trigger
 DETECTION_ACTIVE_DURATION_S = 10
 
-@st.cache_resource
-def load_yolo_model(model_path: str = "./yolo11n_ncnn_model") -> YOLO:
-    """Ensure we have an NCNN‐exported model, then load it."""
-    try:
-        # now load the NCNN version
-        ncnn_model = YOLO(model_path)
-        st.success(f"🔋 Loaded NCNN model from {model_path}")
-        return ncnn_model
+# inference size: YOLO11n still finds person-sized objects indoors at 320
+# with ~4x fewer MACs than the 640 default
+YOLO_IMGSZ = 320
+DETECTION_BATCH_SIZE = 4  # frames queued while the worker is busy, inferred together
+
+# COCO class ids used by the alert logic; they are re-read from the model's
+# names when it loads, in case of a custom label order
+PERSON_CLASS_ID = 0
+PET_CLASS_NAMES = ("cat", "dog")
+PET_CLASS_IDS = np.array([15, 16])  # cat, dog; updated in place (imported by app.py)
+
+class Detections(NamedTuple):
+    """
+    One frame's detections as parallel arrays (no per-box objects).
+    Still unpacks as (boxes, cls_ids, confs).
+    """
+    boxes: np.ndarray    # int32[N, 4] x1, y1, x2, y2
+    cls_ids: np.ndarray  # int32[N]
+    confs: np.ndarray    # float32[N]
+
+EMPTY_DETECTIONS = Detections(
+    np.empty((0, 4), dtype=np.int32),
+    np.empty(0, dtype=np.int32),
+    np.empty(0, dtype=np.float32),
+)
+
+# backend label per exported model suffix (ultralytics picks the runtime itself)
+MODEL_BACKENDS = {
+    ".engine": "TensorRT",
+    ".onnx": "ONNX Runtime",
+    ".tflite": "TFLite",
+    "_ncnn_model": "NCNN",
+    "_openvino_model": "OpenVINO",
+    ".pt": "PyTorch",
+}
+
+def resolve_model_path(candidates):
+    """Return the first model in `candidates` that exists, else the last one."""
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return candidates[-1]
+
+def model_backend(model_path: str) -> str:
+    """Name the inference backend ultralytics will use for `model_path`."""
+    path = model_path.rstrip("/")
+    for suffix, backend in MODEL_BACKENDS.items():
+        if path.endswith(suffix):
+            return backend
+    return "PyTorch"
+
+# formats whose ultralytics exporter reliably applies int8=/half= on the Pi;
+# others (e.g. ONNX on CPU, NCNN) silently export FP32
+INT8_EXPORT_FORMATS = {"engine", "openvino"}
+FP16_EXPORT_FORMATS = {"engine", "openvino"}
+
+def export_quantized_model(weights: str = "yolo11n.pt", fmt: str = "engine",
+                           data: str = "calib.yaml", imgsz: int = YOLO_IMGSZ):
+    """
+    Offline step: export `weights` as an INT8 `fmt` model calibrated on `data`,
+    falling back to FP16, then to a plain FP32 export.
+    Only formats known to honour the precision are renamed, e.g.
+    yolo11n_int8.engine / yolo11n_fp16.engine; FP32 keeps ultralytics' name.
+    Exported engines have a fixed input shape, hence imgsz=YOLO_IMGSZ.
+    """
+    model = YOLO(weights)
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    attempts = []
+    if fmt in INT8_EXPORT_FORMATS:
+        attempts.append(("int8", {"int8": True, "data": data}))
+    if fmt in FP16_EXPORT_FORMATS:
+        attempts.append(("fp16", {"half": True}))
+    attempts.append(("fp32", {}))
+    if fmt == "ncnn":
+        # ultralytics ignores int8 for NCNN; quantize with ncnn2table/ncnn2int8 (see README)
+        print("INT8 export is not supported for ncnn, exporting FP32")
+    for precision, kwargs in attempts:
+        try:
+            exported = str(model.export(format=fmt, imgsz=imgsz, **kwargs)).rstrip("/")
+        except Exception as e:
+            print(f"{precision.upper()} export to {fmt} failed: {e}")
+            continue
+        if precision == "fp32":
+            print(f"Exported FP32 model to {exported}")
+            return exported
+        dirname, name = os.path.split(exported)
+        tag = f"_{precision}"
+        if tag in name:
+            # ultralytics already tags some outputs, e.g. yolo11n_int8_openvino_model
+            target = exported
+        elif os.path.isdir(exported):
+            # directory formats, e.g. yolo11n_openvino_model -> yolo11n_fp16_openvino_model
+            target = os.path.join(dirname, name.replace(stem, stem + tag, 1))
+        else:
+            target = os.path.join(dirname, stem + tag + os.path.splitext(name)[1])
+        if target != exported:
+            os.replace(exported, target)
+        print(f"Exported {precision.upper()} model to {target}")
+        return target
+    return None
+
+def _class_id(names, name, default):
+    """Look up a class id by name in a model's id -> name map."""
+    return next((k for k, v in names.items() if v == name), default)
+
+# loaded once per process and shared by every session; a plain global skips
+# st.cache_resource's argument hashing on each script rerun
+_YOLO_MODEL: Optional[YOLO] = None
+_YOLO_MODEL_PATH: Optional[str] = None
+_YOLO_MODEL_LOCK = threading.Lock()
 
+def load_yolo_model(model_path: str = "./yolo11n_int8_ncnn_model") -> Optional[YOLO]:
+    """
+    Load a YOLO model, dispatching exported engines to their runtime.
+    The first (uncached) load also warms the model up.
+    """
+    global _YOLO_MODEL, _YOLO_MODEL_PATH
+    with _YOLO_MODEL_LOCK:
+        if _YOLO_MODEL is not None and _YOLO_MODEL_PATH == model_path:
+            return _YOLO_MODEL
+
+        backend = model_backend(model_path)
+        try:
+            if backend == "NCNN" and ncnn is not None:
+                model = NCNNDetector(model_path)
+            else:
+                # exported files carry no task metadata, so state it explicitly
+                model = YOLO(model_path, task="detect")
+            st.success(f"🔋 Loaded {backend} model from {model_path}")
+        except Exception as e:
+            st.error(f"Error loading {backend} YOLO model: {e}")
+            return None
+
+        global PERSON_CLASS_ID
+        PERSON_CLASS_ID = _class_id(model.names, "person", PERSON_CLASS_ID)
+        PET_CLASS_IDS[:] = [_class_id(model.names, name, default)
+                            for name, default in zip(PET_CLASS_NAMES, PET_CLASS_IDS.tolist())]
+        warmup_model(model)
+        _YOLO_MODEL, _YOLO_MODEL_PATH = model, model_path
+        return model
+
+def warmup_model(model, runs: int = 3, frame_shape=(240, 320, 3)):
+    """
+    Run a few dummy inferences right after loading so the first real frame
+    (fired by the PIR) does not pay the backend's cold-start cost.
+    """
+    if model is None:
+        return
+    dummy = np.zeros(frame_shape, dtype=np.uint8)
+    try:
+        start = time.time()
+        for _ in range(runs):
+            detect_objects(dummy, model)
+        print(f"YOLO warm-up: {runs} runs in {time.time() - start:.2f}s")
     except Exception as e:
-        st.error(f"Error loading NCNN YOLO model: {e}")
-        return None
+        print(f"YOLO warm-up failed: {e}")
 
 def init_camera():
-    """Set up the PiCamera2 at a smaller resolution for speed."""
+    """
+    Set up the PiCamera2 with a 640x480 main stream for display/clips and a
+    320x240 lores stream, downscaled by the ISP, to feed YOLO at YOLO_IMGSZ.
+    picamera2 names formats by little-endian word order, so "BGR888" yields
+    RGB-ordered arrays, matching what detect_objects expects.
+    """
     picam2 = Picamera2()
     picam2.preview_configuration.main.size = (640, 480)
-    picam2.preview_configuration.main.format = "RGB888"
+    picam2.preview_configuration.main.format = "BGR888"
+    picam2.preview_configuration.enable_lores()
+    picam2.preview_configuration.lores.size = (320, 240)
+    picam2.preview_configuration.lores.format = "BGR888"
+    picam2.preview_configuration.buffer_count = 4
     picam2.set_controls({"FrameRate": 5})
     picam2.preview_configuration.align()
     picam2.configure("preview")
     picam2.start()
     return picam2
 
-def detect_objects(frame, model, confidence_threshold: float = 0.50):
+class NCNNDetector:
     """
-    Run inference on `frame` with the NCNN-backed YOLO model.
-    Returns list of detections and a flag if a person was seen.
+    Runs an ultralytics NCNN export directly through the ncnn bindings:
+    Mat.from_pixels_resize resizes the RGB frame and converts it to float in
+    one native pass, skipping ultralytics' numpy/torch preprocessing.
+    pnnx exports have a fixed input shape, so frames are letterboxed to
+    exactly the export's imgsz.
     """
+    NMS_IOU = 0.7  # ultralytics' default
+
+    def __init__(self, model_dir: str):
+        with open(os.path.join(model_dir, "metadata.yaml")) as f:
+            metadata = yaml.safe_load(f)
+        self.names = metadata["names"]
+        imgsz = metadata["imgsz"]
+        # ultralytics stores imgsz as (h, w), or one int for a square export
+        self.input_h, self.input_w = (imgsz, imgsz) if isinstance(imgsz, int) else imgsz
+        self.net = ncnn.Net()
+        self.net.opt.use_vulkan_compute = False
+        self.net.opt.num_threads = len(INFERENCE_CORES)
+        self.net.load_param(os.path.join(model_dir, "model.ncnn.param"))
+        self.net.load_model(os.path.join(model_dir, "model.ncnn.bin"))
+
+    def infer(self, frame_rgb, confidence_threshold: float):
+        """Detections as float rows x1, y1, x2, y2, conf, cls in frame pixels."""
+        h, w = frame_rgb.shape[:2]
+        r = min(self.input_h / h, self.input_w / w)
+        nw, nh = min(round(w * r), self.input_w), min(round(h * r), self.input_h)
+        mat = ncnn.Mat.from_pixels_resize(np.ascontiguousarray(frame_rgb), ncnn.Mat.PixelType.PIXEL_RGB, w, h, nw, nh)
+        mat.substract_mean_normalize([], [1 / 255.0] * 3)
+        # pad right/bottom up to the export's input shape with ultralytics'
+        # grey, so box coordinates need no offset correction
+        pad_w, pad_h = self.input_w - nw, self.input_h - nh
+        if pad_w or pad_h:
+            mat = ncnn.copy_make_border(mat, 0, pad_h, 0, pad_w, 0, 114 / 255.0)  # 0 = BORDER_CONSTANT
+
+        with self.net.create_extractor() as ex:
+            ret = ex.input("in0", mat)
+            if ret == 0:
+                ret, out = ex.extract("out0")
+        if ret != 0:
+            raise RuntimeError(f"ncnn inference failed with code {ret}")
+        out = np.array(out)  # [4 + num_classes, num_anchors]: cx, cy, w, h, class scores
+
+        scores = out[4:]
+        cls_ids = scores.argmax(axis=0)
+        confs = scores[cls_ids, np.arange(scores.shape[1])]
+        keep = confs >= confidence_threshold
+        if not keep.any():
+            return np.empty((0, 6), dtype=np.float32)
+        cx, cy, bw, bh = out[:4, keep] / r
+        cls_ids, confs = cls_ids[keep], confs[keep]
+        xywh = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+        idx = np.asarray(cv2.dnn.NMSBoxesBatched(
+            xywh.tolist(), confs.tolist(), cls_ids.tolist(), confidence_threshold, self.NMS_IOU
+        ), dtype=np.int64).reshape(-1)
+        xywh = xywh[idx]
+        xyxy = np.column_stack([xywh[:, 0], xywh[:, 1], xywh[:, 0] + xywh[:, 2], xywh[:, 1] + xywh[:, 3]])
+        np.clip(xyxy, 0, [w, h, w, h], out=xyxy)
+        return np.column_stack([xyxy, confs[idx], cls_ids[idx]]).astype(np.float32)
+
+def _supports_batch(model) -> bool:
+    # exported engines (NCNN, TensorRT, ONNX...) are built with a fixed batch of 1
+    return isinstance(getattr(model, "model", None), torch.nn.Module)
+
+def detect_objects(frames, model, confidence_threshold: float = 0.50):
+    """
+    Run inference on an RGB frame, or a list of RGB frames, with the YOLO model.
+    Returns (boxes, class_ids, confidences) arrays and a flag if a person was seen;
+    for a list, returns one such pair per frame.
+    """
+    if isinstance(frames, list):
+        if model is None:
+            return [(EMPTY_DETECTIONS, False)] * len(frames)
+        if len(frames) > 1 and _supports_batch(model):
+            # ultralytics treats ndarrays as BGR; the reversed views are folded
+            # into its letterbox resize instead of a separate cvtColor pass
+            results = model([f[..., ::-1] for f in frames], imgsz=YOLO_IMGSZ,
+                            conf=confidence_threshold, verbose=False)
+            return [_parse_result(r, model, confidence_threshold) for r in results]
+        return [detect_objects(f, model, confidence_threshold) for f in frames]
+
     if model is None:
-        return [], False
-
-    # this will run via NCNN runtime
-    results = model(frame)
-    detections = []
-    person_found = False
-
-    for result in results:
-        for box in result.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            conf = float(box.conf[0])
-            cls = int(box.cls[0])
-            name = model.names[cls]
-            if conf >= confidence_threshold:
-                detections.append({
-                    "class_name": name,
-                    "confidence": conf,
-                    "bbox": [x1, y1, x2, y2]
-                })
-                if name == "person":
-                    person_found = True
-
-    if detections:
-        classes = {d["class_name"] for d in detections}
-        print(f"Detected: {', '.join(classes)} (≥{confidence_threshold})")
-    return detections, person_found
-
-def draw_detections(frame, detections):
-    """Draw boxes & labels on the image."""
-    img = frame.copy()
-    color_map = {
-        'person': (0,255,0),
-        'dog':    (255,165,0),
-        'cat':    (255,0,255),
-        'default':(0,255,255),
-    }
-
-    for det in detections:
-        x1,y1,x2,y2 = det["bbox"]
-        cls = det["class_name"]
-        color = color_map.get(cls, color_map['default'])
-        label = f"{cls}: {det['confidence']:.2f}"
+        return EMPTY_DETECTIONS, False
+    if isinstance(model, NCNNDetector):
+        return _parse_rows(model.infer(frames, confidence_threshold), model, confidence_threshold)
+
+    # conf= lets NMS discard low scores before they are ever copied out
+    results = model(frames[..., ::-1], imgsz=YOLO_IMGSZ, conf=confidence_threshold, verbose=False)
+    return _parse_result(results[0], model, confidence_threshold)
+
+def _parse_result(result, model, confidence_threshold):
+    # one device->host transfer: rows are x1, y1, x2, y2, conf, cls
+    return _parse_rows(result.boxes.data.cpu().numpy(), model, confidence_threshold)
+
+def _parse_rows(data, model, confidence_threshold):
+    data = data[data[:, 4] >= confidence_threshold]
+    if not len(data):
+        # the common idle case: nothing to convert or report
+        return EMPTY_DETECTIONS, False
+    boxes = data[:, :4].astype(np.int32)
+    cls_ids = data[:, 5].astype(np.int32)
+    confs = data[:, 4].astype(np.float32)
+    person_found = bool((cls_ids == PERSON_CLASS_ID).any())
+
+    classes = {model.names[c] for c in np.unique(cls_ids).tolist()}
+    print(f"Detected: {', '.join(classes)} (≥{confidence_threshold})")
+    return Detections(boxes, cls_ids, confs), person_found
+
+def scale_detections(detections, src_shape, dst_shape):
+    """Map detection boxes from a frame of `src_shape` onto one of `dst_shape`."""
+    sy = dst_shape[0] / src_shape[0]
+    sx = dst_shape[1] / src_shape[1]
+    if sx == 1 and sy == 1:
+        return detections
+    scaled = (detections.boxes * np.array([sx, sy, sx, sy])).astype(np.int32)
+    return detections._replace(boxes=scaled)
+
+def _pin_inference_thread():
+    # pid 0 = the calling thread; threads it spawns (OpenMP/NCNN) inherit the mask
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, INFERENCE_CORES)
+        except OSError as e:
+            print(f"Could not pin inference thread to cores {sorted(INFERENCE_CORES)}: {e}")
+
+class AsyncDetector:
+    """
+    Runs detect_objects on a single background worker so the capture/UI loop
+    never waits on inference; the loop reads the most recent result instead.
+    Frames submitted while the worker is busy are queued and inferred together
+    as the next batch: the newest `batch_size` for models that really batch,
+    otherwise only the newest one, so stale frames never run back to back.
+    """
+    def __init__(self, model, confidence_threshold: float = 0.50,
+                 batch_size: int = DETECTION_BATCH_SIZE):
+        self.model = model
+        self.confidence_threshold = confidence_threshold
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="yolo",
+                                            initializer=_pin_inference_thread)
+        if not _supports_batch(model):
+            batch_size = 1
+        self._pending = deque(maxlen=batch_size)  # owned copies awaiting inference
+        self._running = False
+        self._lock = threading.Lock()
+        self._latest = (EMPTY_DETECTIONS, False)
+        self._generation = 0
+
+    def submit(self, frame):
+        """Queue a copy of `frame`; starts a batch right away if the worker is idle."""
+        frame = frame.copy()
+        with self._lock:
+            self._pending.append(frame)
+            if not self._running:
+                self._start_batch()
+
+    def _start_batch(self):
+        # caller holds self._lock
+        frames = list(self._pending)
+        self._pending.clear()
+        self._running = True
+        self._executor.submit(self._run, frames, self._generation)
+
+    def _run(self, frames, generation):
+        try:
+            results = detect_objects(frames, self.model, self.confidence_threshold)
+        except Exception as e:
+            print(f"Error during YOLO inference: {e}")
+            results = None
+        with self._lock:
+            # drop results that finish after a reset (e.g. PIR window closed)
+            if results and generation == self._generation:
+                # boxes of the newest frame; a person anywhere in the batch counts
+                self._latest = (results[-1][0], any(found for _, found in results))
+            self._running = False
+            if self._pending:
+                self._start_batch()
+
+    def latest(self):
+        """Most recent (detections, person_found)."""
+        with self._lock:
+            return self._latest
+
+    def reset(self):
+        """Forget the last result and discard any inference still in flight."""
+        with self._lock:
+            self._generation += 1
+            self._pending.clear()
+            self._latest = (EMPTY_DETECTIONS, False)
+
+class FrameDiffGate:
+    """
+    Cheap temporal gate: compares a tiny grayscale thumbnail of each frame
+    with the last frame that went through YOLO and reports whether the scene
+    changed enough to be worth another inference.
+    """
+    def __init__(self, threshold: float = 3.0, size=(80, 60)):
+        self.threshold = threshold
+        self.size = size
+        self.prev_gray = None
+
+    def should_infer(self, frame_rgb) -> bool:
+        small = cv2.resize(frame_rgb, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        if self.prev_gray is not None and cv2.absdiff(gray, self.prev_gray).mean() < self.threshold:
+            return False
+        self.prev_gray = gray
+        return True
+
+    def reset(self):
+        """Force the next frame through YOLO (e.g. at the start of a PIR window)."""
+        self.prev_gray = None
+
+COLOR_MAP = {
+    'person': (0,255,0),
+    'dog':    (255,165,0),
+    'cat':    (255,0,255),
+    'default':(0,255,255),
+}
+
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_FONT_SCALE = 0.5
+LABEL_THICKNESS = 2
+# fixed font and scale, so the label height never changes
+LABEL_TEXT_H = cv2.getTextSize("Ag", LABEL_FONT, LABEL_FONT_SCALE, LABEL_THICKNESS)[0][1]
+
+LABEL_H = LABEL_TEXT_H + 10  # text plus room below the baseline
+MAX_LABEL_W = 320
+
+def new_label_strip():
+    """
+    Scratch strip a label is composed in before one copy into the frame.
+    Give each drawing thread its own: Streamlit runs every session's script
+    on a separate thread.
+    """
+    return np.empty((LABEL_H, MAX_LABEL_W, 3), dtype=np.uint8)
+
+@lru_cache(maxsize=1024)
+def _label_width(label):
+    # labels are "<class>: <conf>", a small bounded set
+    return min(cv2.getTextSize(label, LABEL_FONT, LABEL_FONT_SCALE, LABEL_THICKNESS)[0][0], MAX_LABEL_W)
+
+def _draw_label(img, label, x, y, color, label_strip):
+    """Draw `label` on a filled `color` box whose bottom-left corner is (x, y)."""
+    w = _label_width(label)
+    strip = label_strip[:, :w]
+    strip[:] = color
+    cv2.putText(strip, label, (0, LABEL_H - 10),
+                LABEL_FONT, LABEL_FONT_SCALE, (255,255,255), LABEL_THICKNESS)
+    # clip to the frame; boxes touching the top edge push the label off-image
+    top = y - LABEL_H
+    y0, y1 = max(top, 0), min(y, img.shape[0])
+    x0, x1 = max(x, 0), min(x + w, img.shape[1])
+    if y0 < y1 and x0 < x1:
+        img[y0:y1, x0:x1] = strip[y0-top:y1-top, x0-x:x1-x]
+
+def draw_detections(frame, detections, class_names, out=None, label_strip=None):
+    """
+    Draw boxes & labels on the image; `class_names` maps class id -> name.
+    Draws on a copy by default, into `out` when given (pass `out=frame` to
+    draw in place). `label_strip` (from new_label_strip) is reused if given.
+    """
+    if label_strip is None:
+        label_strip = new_label_strip()
+    if out is None:
+        img = frame.copy()
+    else:
+        if out is not frame:
+            np.copyto(out, frame)
+        img = out
+
+    boxes, cls_ids, confs = detections
+    for (x1,y1,x2,y2), cls_id, conf in zip(boxes.tolist(), cls_ids.tolist(), confs.tolist()):
+        cls = class_names[cls_id]
+        color = COLOR_MAP.get(cls, COLOR_MAP['default'])
+        label = f"{cls}: {conf:.2f}"
         cv2.rectangle(img, (x1,y1), (x2,y2), color, 2)
-        (w,h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)
-        cv2.rectangle(img, (x1, y1-h-10), (x1+w, y1), color, -1)
-        cv2.putText(img, label, (x1, y1-10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255,255,255), 2)
+        _draw_label(img, label, x1, y1, color, label_strip)
     return img
@@ -1,10 +1,25 @@
 # telegram_notifier.py
+import mimetypes
+import os
 import requests
 import streamlit as st
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # streams the upload from disk instead of building the whole body in memory
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 
 NOTIFICATION_COOLDOWN_S = 60
 
+# Uploads run here so a slow network never stalls frame capture
+_notification_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="telegram")
+
+# Shared across alerts so the TCP/TLS connection to api.telegram.org is kept alive
+_session = requests.Session()
+
 def init_telegram_state():
     if 'last_notification_time' not in st.session_state:
         st.session_state.last_notification_time = 0
@@ -34,8 +49,8 @@ def send_telegram_message_with_photo(bot_token, chat_id, caption, image_path):
 
 
 
-def send_telegram_animation(bot_token, chat_id, caption, gif_path):
-    """Sends an animation (GIF) to a Telegram chat."""
+def _notification_allowed(bot_token, chat_id):
+    """Settings and cooldown checks shared by the sync and background senders."""
     # Check if notifications are globally enabled (from app.py's session state)
     if not st.session_state.get('telegram_notifications_enabled', True): # Default to True if key missing
         st.info("Telegram notifications are currently disabled in settings.")
@@ -50,27 +65,73 @@ def send_telegram_animation(bot_token, chat_id, caption, gif_path):
         st.info("Telegram notification skipped due to cooldown.")
         print("Notification cooldown active. Skipping Telegram animation.")
         return False
+    return True
 
+def post_telegram_animation(bot_token, chat_id, caption, gif_path):
+    """
+    Uploads the animation to Telegram. Makes no Streamlit calls, so it is safe
+    to run on a worker thread. Returns (ok, message).
+    """
     url = f"https://api.telegram.org/bot{bot_token}/sendAnimation"
     try:
         with open(gif_path, 'rb') as animation_file:
-            files = {'animation': animation_file}
-            data = {'chat_id': chat_id, 'caption': caption}
-            response = requests.post(url, files=files, data=data, timeout=20) 
+            if MultipartEncoder is not None:
+                content_type = mimetypes.guess_type(gif_path)[0] or 'application/octet-stream'
+                body = MultipartEncoder(fields={
+                    'chat_id': str(chat_id),
+                    'caption': caption,
+                    'animation': (os.path.basename(gif_path), animation_file, content_type),
+                })
+                response = _session.post(url, data=body, headers={'Content-Type': body.content_type}, timeout=20)
+            else:
+                files = {'animation': animation_file}
+                data = {'chat_id': chat_id, 'caption': caption}
+                response = _session.post(url, files=files, data=data, timeout=20)
         response.raise_for_status()
         if response.json().get("ok"):
-            st.success(f"Intrusion alert GIF sent to Telegram Chat ID {chat_id}!")
-            update_last_notification_time()
-            return True
+            return True, f"Intrusion alert clip sent to Telegram Chat ID {chat_id}!"
         else:
-            st.error(f"Telegram API Error (Animation): {response.json().get('description')}")
-            return False
+            return False, f"Telegram API Error (Animation): {response.json().get('description')}"
     except requests.exceptions.RequestException as e:
-        st.error(f"Failed to send Telegram animation: {e}")
-        return False
+        return False, f"Failed to send Telegram animation: {e}"
     except FileNotFoundError:
-        st.error(f"Animation GIF not found at {gif_path}")
-        return False
+        return False, f"Animation file not found at {gif_path}"
     except Exception as e:
-        st.error(f"An unexpected error occurred during Telegram animation sending: {e}")
-        return False
\ No newline at end of file
+        return False, f"An unexpected error occurred during Telegram animation sending: {e}"
+
+def send_telegram_animation(bot_token, chat_id, caption, gif_path):
+    """Sends an animation (GIF or MP4 clip) to a Telegram chat."""
+    if not _notification_allowed(bot_token, chat_id):
+        return False
+
+    ok, message = post_telegram_animation(bot_token, chat_id, caption, gif_path)
+    if ok:
+        st.success(message)
+        update_last_notification_time()
+    else:
+        st.error(message)
+    return ok
+
+def _log_send_result(future):
+    ok, message = future.result()
+    print(message if ok else f"[!] {message}")
+
+def _post_when_ready(ready, bot_token, chat_id, caption, gif_path):
+    if ready is not None and ready.result() is None:
+        return False, f"Animation file {gif_path} was not created; nothing sent"
+    return post_telegram_animation(bot_token, chat_id, caption, gif_path)
+
+def send_telegram_animation_async(bot_token, chat_id, caption, gif_path, ready=None):
+    """
+    Like send_telegram_animation, but the upload runs on a background thread so
+    the detection loop never waits on the network. If `ready` is given (a future
+    resolving to the file path, or None on failure), the upload waits for it.
+    The cooldown starts when the upload is queued. Returns True if it was queued.
+    """
+    if not _notification_allowed(bot_token, chat_id):
+        return False
+
+    update_last_notification_time()
+    future = _notification_executor.submit(_post_when_ready, ready, bot_token, chat_id, caption, gif_path)
+    future.add_done_callback(_log_send_result)
+    return True
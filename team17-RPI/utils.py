@@ -1,8 +1,16 @@
 # utils.py
 import cv2
 import os
+import csv
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 from PIL import Image # For GIF creation
+import psutil
 
 SNAPSHOT_DIR = "snapshots" # We can keep this name, it will now store JPGs and GIFs
 if not os.path.exists(SNAPSHOT_DIR):
@@ -11,11 +19,17 @@ if not os.path.exists(SNAPSHOT_DIR):
 NUM_JPG_FRAMES_TO_SAVE = 4
 NUM_GIF_FRAMES = 10
 GIF_FRAME_DURATION_MS = 150 # Milliseconds per frame in GIF (approx 6.7 FPS)
+JPEG_QUALITY = 85 # Snapshot quality; OpenCV's default 95 is ~2x the bytes for little visible gain
+
+THERMAL_ZONE_PATH = "/sys/class/thermal/thermal_zone0/temp"
+STATS_TTL_S = 1.0 # System stats are sampled at most once per second
+
+_metric_cache = {} # metric name -> (timestamp, value)
 
 def save_individual_frame_as_jpg(frame, base_filename="frame"):
     """Saves a single frame as a JPG image with a unique timestamp."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f") # Added microseconds for uniqueness
-    filename = f"{base_filename}_{timestamp}.jpg"
+    # only needs to be unique; time_ns avoids the datetime/strftime overhead
+    filename = f"{base_filename}_{time.time_ns()}.jpg"
     filepath = os.path.join(SNAPSHOT_DIR, filename)
     try:
         cv2.imwrite(filepath, frame)
@@ -25,36 +39,79 @@ def save_individual_frame_as_jpg(frame, base_filename="frame"):
         print(f"Error saving snapshot: {e}")
         return None
 
-def save_sequence_as_jpgs(frames_bgr, base_filename="detection_event"):
-    """Saves the first NUM_JPG_FRAMES_TO_SAVE from a list of BGR frames as JPG images."""
+def _open_snapshot_dir():
+    """fd of SNAPSHOT_DIR for openat-style writes, or None where dir_fd is unsupported."""
+    if not hasattr(os, "O_DIRECTORY") or os.open not in os.supports_dir_fd:
+        return None
+    try:
+        return os.open(SNAPSHOT_DIR, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return None
+
+_SNAPSHOT_DIR_FD = _open_snapshot_dir()
+
+def _write_snapshot(filename, buf):
+    """Write `buf` to SNAPSHOT_DIR/filename via a temp file and an atomic rename."""
+    tmp_name = filename + ".tmp"
+    if _SNAPSHOT_DIR_FD is None:
+        tmp_name = os.path.join(SNAPSHOT_DIR, tmp_name)
+        filename = os.path.join(SNAPSHOT_DIR, filename)
+    fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644, dir_fd=_SNAPSHOT_DIR_FD)
+    try:
+        data = memoryview(buf).cast("B")
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+    # readers (history sidebar) never see a half-written file
+    os.replace(tmp_name, filename, src_dir_fd=_SNAPSHOT_DIR_FD, dst_dir_fd=_SNAPSHOT_DIR_FD)
+
+def _jpg_writer():
+    """Writes encoded JPGs to the SD card so the camera loop only pays for the encode."""
+    while True:
+        filename, buf = _jpg_write_queue.get()
+        try:
+            _write_snapshot(filename, buf)
+            print(f"Saved JPG: {os.path.join(SNAPSHOT_DIR, filename)}")
+        except OSError as e:
+            print(f"Error saving JPG {filename}: {e}")
+
+_jpg_write_queue = queue.Queue()
+threading.Thread(target=_jpg_writer, daemon=True, name="jpg-writer").start()
+
+def save_sequence_as_jpgs(frames_rgb, base_filename="detection_event"):
+    """
+    Saves the first NUM_JPG_FRAMES_TO_SAVE from a list of RGB frames as JPG images.
+    Frames are encoded here; the files are written by a background thread, so
+    the returned paths may appear on disk a moment later.
+    """
     saved_jpg_paths = []
     timestamp_prefix = datetime.now().strftime("%m%d_%H%M%S")
-    for i, frame in enumerate(frames_bgr):
+    for i, frame in enumerate(frames_rgb):
         if i >= NUM_JPG_FRAMES_TO_SAVE:
             break
         filename = f"{base_filename}_{timestamp_prefix}_frame_{i+1}.jpg"
         filepath = os.path.join(SNAPSHOT_DIR, filename)
-        try:
-            cv2.imwrite(filepath, frame)
-            saved_jpg_paths.append(filepath)
-            print(f"Saved JPG: {filepath}")
-        except Exception as e:
-            print(f"Error saving JPG {filepath}: {e}")
+        ok, buf = cv2.imencode(".jpg", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                               [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            print(f"Error encoding JPG {filepath}")
+            continue
+        _jpg_write_queue.put((filename, buf))
+        saved_jpg_paths.append(filepath)
     return saved_jpg_paths
 
-def create_gif_from_frames(frames_bgr, base_filename="detection_event_animation"):
-    """Creates a GIF from a list of BGR frames."""
-    if not frames_bgr:
+def create_gif_from_frames(frames_rgb, base_filename="detection_event_animation", gif_filepath=None):
+    """Creates a GIF from a list (or array) of RGB frames."""
+    if len(frames_rgb) == 0:
         return None
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    gif_filename = f"{base_filename}_{timestamp}.gif"
-    gif_filepath = os.path.join(SNAPSHOT_DIR, gif_filename)
+    if gif_filepath is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        gif_filename = f"{base_filename}_{timestamp}.gif"
+        gif_filepath = os.path.join(SNAPSHOT_DIR, gif_filename)
 
-    pil_frames = []
-    for frame_bgr in frames_bgr:
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        pil_frames.append(Image.fromarray(frame_rgb))
+    pil_frames = [Image.fromarray(frame_rgb) for frame_rgb in frames_rgb]
 
     if not pil_frames:
         return None
@@ -73,6 +130,206 @@ def create_gif_from_frames(frames_bgr, base_filename="detection_event_animation"
         print(f"Error creating GIF: {e}")
         return None
 
+def _cached(metric_name, ttl, read):
+    """Return read()'s value, calling it at most once per `ttl` seconds per metric."""
+    now = time.time()
+    cached = _metric_cache.get(metric_name)
+    if cached is None or now - cached[0] >= ttl:
+        cached = (now, read())
+        _metric_cache[metric_name] = cached
+    return cached[1]
+
+def _read_temperature():
+    """CPU temperature in °C read from sysfs (no vcgencmd fork)."""
+    try:
+        with open(THERMAL_ZONE_PATH) as f:
+            return int(f.read()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+def _get_temp_cached(ttl=STATS_TTL_S):
+    """CPU temperature in °C, cached for `ttl` seconds."""
+    return _cached("temperature", ttl, _read_temperature)
+
+@dataclass
+class SystemStats:
+    """Latest CPU/RAM/temperature readings, refreshed by the logger thread."""
+    cpu_percent: float = 0.0
+    ram_percent: float = 0.0
+    temperature: Optional[float] = None
+
+    def refresh(self, ttl=STATS_TTL_S):
+        """Update the fields from the 1 Hz metric cache (no /proc parse per frame)."""
+        self.cpu_percent = _cached("cpu_percent", ttl, lambda: psutil.cpu_percent(interval=None))
+        self.ram_percent = _cached("ram_percent", ttl, lambda: psutil.virtual_memory().percent)
+        self.temperature = _get_temp_cached(ttl)
+        return self
+
+# H.264 only: Telegram's sendAnimation and browsers (st.video) cannot play
+# MPEG-4 Part 2 (mp4v), so that is not an acceptable fallback
+MP4_FOURCCS = ("avc1", "H264")
+
+def _open_mp4_writer(path, fps, size):
+    """(writer, fourcc) for the first H.264 FourCC this OpenCV build can open, else (None, None)."""
+    for fourcc in MP4_FOURCCS:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if writer.isOpened():
+            return writer, fourcc
+        writer.release()
+    return None, None
+
+_h264_probe = {}  # "fourcc" -> first H.264 FourCC that opens, or None
+
+def h264_available():
+    """Whether this OpenCV build can write H.264 (pip wheels usually cannot). Probed once."""
+    if "fourcc" not in _h264_probe:
+        probe_path = os.path.join(SNAPSHOT_DIR, ".h264_probe.mp4")
+        writer, fourcc = _open_mp4_writer(probe_path, 1000 / GIF_FRAME_DURATION_MS, (640, 480))
+        if writer is not None:
+            writer.release()
+        if os.path.exists(probe_path):
+            os.remove(probe_path)
+        _h264_probe["fourcc"] = fourcc
+        print(f"Event clips: {'H.264 MP4 (' + fourcc + ')' if fourcc else 'GIF (no H.264 encoder in this OpenCV build)'}")
+    return _h264_probe["fourcc"] is not None
+
+def new_clip_path(base_filename="detection_event_clip"):
+    """Timestamped path in SNAPSHOT_DIR for a new event clip: .mp4 if H.264 is available, else .gif."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ext = ".mp4" if h264_available() else ".gif"
+    return os.path.join(SNAPSHOT_DIR, f"{base_filename}_{timestamp}{ext}")
+
+def create_mp4_from_frames(frames_rgb, base_filename="detection_event_clip", mp4_filepath=None):
+    """
+    Encodes a list of RGB frames as an H.264 MP4 (software encoder; the Pi 5
+    has no H.264 hardware encoder). Telegram's sendAnimation accepts H.264 MP4
+    as an animation. Without an H.264 writer the clip is saved as a GIF
+    instead, which Telegram and the sidebar both still play.
+    """
+    if len(frames_rgb) == 0:
+        return None
+
+    if mp4_filepath is None:
+        mp4_filepath = new_clip_path(base_filename)
+    if not h264_available() or mp4_filepath.endswith(".gif"):
+        return create_gif_from_frames(frames_rgb, base_filename, gif_filepath=os.path.splitext(mp4_filepath)[0] + ".gif")
+
+    height, width = frames_rgb[0].shape[:2]
+    fps = 1000 / GIF_FRAME_DURATION_MS
+    writer, fourcc = _open_mp4_writer(mp4_filepath, fps, (width, height))
+    if writer is None:
+        print(f"Error creating MP4: no H.264 video writer available for {mp4_filepath}")
+        return None
+    try:
+        # VideoWriter expects BGR; convert every frame into one scratch buffer
+        frame_bgr = None
+        for frame_rgb in frames_rgb:
+            frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR, dst=frame_bgr)
+            writer.write(frame_bgr)
+        print(f"MP4 ({fourcc}) saved to {mp4_filepath}")
+        return mp4_filepath
+    except Exception as e:
+        print(f"Error creating MP4: {e}")
+        return None
+    finally:
+        writer.release()
+
+# Clips are encoded here so the detection loop resumes right after an event.
+# A thread, not a process: the frames are handed over without pickling them,
+# and cv2 releases the GIL while encoding.
+_clip_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip")
+
+def create_mp4_from_frames_async(frames_rgb, base_filename="detection_event_clip"):
+    """
+    Encode on a background thread (MP4, or GIF without H.264; see
+    create_mp4_from_frames). Returns (clip_path, future) right away;
+    the future resolves to the path, or None if encoding failed. The caller
+    must not modify `frames_rgb` afterwards.
+    """
+    mp4_filepath = new_clip_path(base_filename)
+    future = _clip_executor.submit(create_mp4_from_frames, frames_rgb, base_filename, mp4_filepath)
+    return mp4_filepath, future
+
+class PerformanceLogger:
+    """Writes the per-frame profiling CSV from a background thread."""
+
+    HEADER = [
+        "timestamp", "inference_time", "fps",
+        "cpu_percent", "ram_percent", "temperature",
+        "person_detected", "num_detections", "sleep_interval"
+    ]
+    _STOP = object()
+
+    def __init__(self, log_path="project_test_enhanced.csv", batch_size=20, flush_interval_s=1.0, flush_every_rows=50):
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.flush_every_rows = flush_every_rows
+        self._queue = queue.Queue(maxsize=1000)
+        self.stats = SystemStats()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def log(self, timestamp, inference_time, fps, person_detected, num_detections, sleep_interval):
+        """Queue one row without blocking the detection loop."""
+        try:
+            self._queue.put_nowait((timestamp, inference_time, fps, person_detected, num_detections, sleep_interval))
+        except queue.Full:
+            print("[!] Logging queue full, dropping row")
+
+    def close(self, timeout=2.0):
+        """Write out pending rows and close the CSV (called when the system stops)."""
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        """Drain the queue into a long-lived, buffered CSV handle, writing rows in batches."""
+        try:
+            log_file = open(self.log_path, "a", newline="", buffering=1 << 16)
+        except OSError as e:
+            print(f"[!] Logging failed: {e}")
+            return
+        writer = csv.writer(log_file)
+        if log_file.tell() == 0:
+            writer.writerow(self.HEADER)
+
+        pending = []
+        unflushed = 0
+        last_write = time.time()
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval_s)
+                if item is self._STOP:
+                    stopping = True
+                else:
+                    timestamp, inference_time, fps, person_detected, num_detections, sleep_interval = item
+                    stats = self.stats.refresh()
+                    pending.append([
+                        timestamp, inference_time, fps,
+                        stats.cpu_percent, stats.ram_percent, stats.temperature,
+                        person_detected, num_detections, sleep_interval
+                    ])
+            except queue.Empty:
+                pass
+
+            if pending and (stopping or len(pending) >= self.batch_size
+                            or time.time() - last_write >= self.flush_interval_s):
+                try:
+                    writer.writerows(pending)
+                    unflushed += len(pending)
+                    # let the 64 KiB buffer absorb writes; hit the SD card every N rows
+                    if unflushed >= self.flush_every_rows:
+                        log_file.flush()
+                        unflushed = 0
+                    print(f"[+] Logged {len(pending)} rows")
+                except Exception as write_error:
+                    print(f"[!] Logging failed: {write_error}")
+                pending = []
+                last_write = time.time()
+
+        log_file.close()
+
 class EnergyMonitor:
     """Class to monitor and calculate energy usage of the system."""
     
@@ -81,10 +338,11 @@ class EnergyMonitor:
     
     def reset_stats(self):
         """Reset all energy monitoring statistics."""
-        self.start_time = datetime.now()
+        # monotonic seconds: cheap to read and immune to clock/DST changes
+        self.start_time = time.monotonic()
         self.total_energy = 0.0
         self.detection_active_time = 0.0
-        self.last_update = datetime.now()
+        self.last_update = self.start_time
         
         # Power consumption estimates (in Watts)
         self.CAMERA_POWER = 0.3  # USB camera
@@ -94,8 +352,8 @@ class EnergyMonitor:
     
     def update(self, pir_active=False, camera_active=False, detection_active=False):
         """Update energy calculations based on current component states."""
-        current_time = datetime.now()
-        time_delta = (current_time - self.last_update).total_seconds()
+        current_time = time.monotonic()
+        time_delta = current_time - self.last_update
         
         # Calculate power consumption for this interval
         power = 0.0
@@ -119,8 +377,7 @@ class EnergyMonitor:
     
     def get_stats(self):
         """Get current energy monitoring statistics."""
-        current_time = datetime.now()
-        total_time = (current_time - self.start_time).total_seconds()
+        total_time = time.monotonic() - self.start_time
         
         return {
             "total_energy": self.total_energy,